@@ -0,0 +1,131 @@
+# auth.py
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from SmartApi import SmartConnect
+from logzero import logger
+from config import API_KEY, USERNAME, MPIN, totp  # Import credentials from config.py
+
+try:
+    import fcntl  # File locking (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# Session tokens are cached here so repeated runs can skip the TOTP login
+SESSION_FILE = os.path.join(os.path.expanduser("~"), ".cache", "algo_trading", "session.json")
+SESSION_TTL = timedelta(hours=6)
+EXPIRY_MARGIN = timedelta(seconds=60)  # Treat tokens as expired slightly early
+TOTP_MIN_VALIDITY = 2  # Seconds a TOTP code must stay valid for the login request
+
+
+def _login(smartApi):
+    """
+    Log in with MPIN + TOTP and refresh the JWT.
+    Returns the jwtToken/refreshToken/feedToken set on the SmartConnect object.
+    """
+    # Generate TOTP using the TOTP secret from .env. If the current 30 s step is
+    # about to roll over, wait for the next code so the server doesn't reject it.
+    try:
+        remaining = totp().interval - time.time() % totp().interval
+        if remaining < TOTP_MIN_VALIDITY:
+            time.sleep(remaining)
+        otp = totp().now()
+    except Exception as e:
+        logger.error("Invalid Token: The provided token is not valid.")
+        raise e
+
+    # Authenticate using MPIN (as password login is no longer allowed)
+    data = smartApi.generateSession(USERNAME, MPIN, otp)
+    if not data.get('status'):
+        logger.error(data)
+        raise ValueError("Login failed. Check credentials or try again later.")
+
+    refreshToken = data['data']['refreshToken']
+    smartApi.generateToken(refreshToken)
+
+    return {
+        "jwtToken": smartApi.access_token,
+        "refreshToken": refreshToken,
+        "feedToken": smartApi.getfeedToken(),
+    }
+
+
+def _is_valid(smartApi, refreshToken):
+    """
+    Check that the broker still accepts the JWT set on the SmartConnect object.
+    """
+    try:
+        return bool(smartApi.getProfile(refreshToken).get('status'))
+    except Exception:
+        return False
+
+
+def _refresh(smartApi, refreshToken):
+    """
+    Get a new JWT from the refresh token; returns the new tokens, or None if the
+    refresh token was rejected too.
+    """
+    try:
+        data = smartApi.generateToken(refreshToken)
+    except Exception as e:  # SmartConnect fails on data['data'] when the refresh is rejected
+        logger.warning(f"Token refresh failed: {e}")
+        return None
+    if not data or not data.get('status'):
+        logger.warning(f"Token refresh failed: {data}")
+        return None
+
+    return {
+        "jwtToken": smartApi.access_token,
+        "refreshToken": refreshToken,
+        "feedToken": smartApi.getfeedToken(),
+    }
+
+
+def get_session():
+    """
+    Return an authenticated SmartConnect object.
+    Reuses the tokens cached in SESSION_FILE while they are younger than SESSION_TTL
+    and the broker still accepts them. Otherwise the JWT is renewed with the cached
+    refresh token, falling back to a fresh TOTP login if that fails too, and the
+    new tokens are cached. The cache file is locked
+    while it is read/written, so main.py and historical_data_fetch.py can run
+    at the same time.
+    """
+    os.makedirs(os.path.dirname(SESSION_FILE), exist_ok=True)
+    fd = os.open(SESSION_FILE, os.O_RDWR | os.O_CREAT, 0o600)  # Tokens are secrets: owner-only
+
+    with os.fdopen(fd, "r+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)  # Released when the file is closed
+
+        try:
+            session = json.load(f)
+        except ValueError:
+            session = None  # Empty or corrupt cache file
+
+        now = datetime.now(timezone.utc)
+        tokens = None
+        if session:
+            cached = session["tokens"]
+            smartApi = SmartConnect(API_KEY,
+                                    access_token=cached["jwtToken"],
+                                    refresh_token=cached["refreshToken"],
+                                    feed_token=cached["feedToken"])
+            if (now < datetime.fromisoformat(session["expiry"]) - EXPIRY_MARGIN
+                    and _is_valid(smartApi, cached["refreshToken"])):
+                return smartApi
+
+            # Expired, or invalidated by the broker before the TTL: try the refresh token
+            logger.info("Cached session is no longer valid, refreshing it.")
+            tokens = _refresh(smartApi, cached["refreshToken"])
+
+        if tokens is None:
+            smartApi = SmartConnect(API_KEY)
+            tokens = _login(smartApi)
+
+        f.seek(0)
+        f.truncate()
+        json.dump({"tokens": tokens, "expiry": (now + SESSION_TTL).isoformat()}, f)
+
+    return smartApi
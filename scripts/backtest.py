@@ -1,8 +1,29 @@
 import backtrader as bt      # For backtesting
 import pandas as pd          # For data loading and manipulation
 import os                    # For file and directory operations
+import argparse              # For command-line options
+import itertools             # For parameter grids
+import tempfile              # For the shared (memory-mapped) parameter sweep data
 from datetime import datetime
-import numpy as np           # For numerical operations (if needed)
+import numpy as np           # For numerical operations
+import bottleneck as bn      # For fast (C-level) moving averages
+import pyarrow as pa         # For fast (multi-threaded) CSV/Parquet loading
+import pyarrow.compute as pc
+import pyarrow.csv as pv_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from joblib import Parallel, delayed  # For parallel parameter sweeps
+
+try:
+    from numba import njit, prange  # JIT compiler for the vectorized backtest loop
+except ImportError:
+    # Numba is optional: fall back to a no-op decorator so the fast backtest
+    # still runs (as plain Python) when numba is not installed.
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+    prange = range
 
 # -------------------------------
 # 1. Define the SMA Crossover Strategy with Target/Stop-Loss
@@ -22,6 +43,10 @@ class SmaTargetStopStrategy(bt.Strategy):
       - For a long position: the price rises to a target (entry * (1 + target)) OR falls to a stop-loss (entry * (1 - stop_loss)).
       - For a short position: the price falls to a target (entry * (1 - target)) OR rises to a stop-loss (entry * (1 + stop_loss)).
     
+    The SMAs and the crossover signal are precomputed by load_data() and read
+    from the data feed (see SmaPandasData), so short_window and long_window must
+    match the windows passed to load_data().
+    
     Parameters:
       target (float): Profit target as a fraction (e.g., 0.003 for 0.3% profit)
       stop_loss (float): Stop loss as a fraction (e.g., 0.001 for 0.1% loss)
@@ -36,11 +61,11 @@ class SmaTargetStopStrategy(bt.Strategy):
     )
 
     def __init__(self):
-        # Create moving average indicators on the closing price.
-        self.short_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.short_window)
-        self.long_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.long_window)
-        # Create a crossover indicator (value > 0 indicates short_sma > long_sma, and vice versa)
-        self.crossover = bt.indicators.CrossOver(self.short_sma, self.long_sma)
+        # Moving averages precomputed on the closing price (see load_data).
+        self.short_sma = self.data.sma_s
+        self.long_sma = self.data.sma_l
+        # Precomputed crossover (+1 when short_sma crosses above long_sma, -1 when it crosses below)
+        self.crossover = self.data.crossover
         
         # Initialize order and entry price variables.
         self.order = None
@@ -82,11 +107,11 @@ class SmaTargetStopStrategy(bt.Strategy):
         # If not in a position, check for entry signal.
         if not self.position:
             # Long entry: when short SMA > long SMA.
-            if self.crossover > 0:
+            if self.crossover[0] > 0:
                 self.order = self.buy()  # Enter long position
                 return
             # Short entry: when short SMA < long SMA.
-            elif self.crossover < 0:
+            elif self.crossover[0] < 0:
                 self.order = self.sell()  # Enter short position
                 return
 
@@ -116,95 +141,453 @@ class SmaTargetStopStrategy(bt.Strategy):
 # 2. Data Loading Function
 # -------------------------------
 
-def load_data(csv_file):
+class SmaPandasData(bt.feeds.PandasData):
+    """
+    Pandas data feed with the precomputed SMA and crossover columns as extra lines.
+    """
+    lines = ('sma_s', 'sma_l', 'crossover')
+    params = (
+        ('sma_s', -1),
+        ('sma_l', -1),
+        ('crossover', -1),
+    )
+
+
+# Source column -> column name expected by Backtrader.
+COLUMN_MAP = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+
+
+def _sma(close, window):
+    """
+    Simple moving average of a closing-price array.
+    The first (window - 1) values are NaN, like Backtrader's warm-up period.
+    """
+    if window > close.shape[0]:
+        return np.full(close.shape[0], np.nan)  # Not enough bars (e.g. a short date range)
+    return bn.move_mean(close, window)
+
+
+def _crossover(short_sma, long_sma):
+    """
+    Crossover signal in one NumPy pass, as an int8 array: +1 when the short SMA
+    crosses above the long SMA, -1 when it crosses below, 0 otherwise (including
+    the warm-up period).
+    Like bt.CrossOver, bars where both SMAs are equal are not a crossing: each bar
+    is compared with the last non-zero difference before it.
+    """
+    cross = np.sign(short_sma - long_sma)  # NaN during the warm-up
+    nonzero = np.nan_to_num(cross) != 0
+    # Index of the last non-zero difference up to each bar (-1 before the first one)
+    last = np.maximum.accumulate(np.where(nonzero, np.arange(cross.size), -1))
+    prev = np.zeros_like(cross)
+    prev[1:] = np.where(last[:-1] >= 0, cross[last[:-1]], 0)
+    return np.where(nonzero & (prev != 0) & (cross != prev), cross, 0).astype(np.int8)
+
+
+def _read_dataset(dataset_dir, start=None, end=None):
     """
-    Load historical data from a CSV file and prepare it for Backtrader.
-    Expects the CSV file to have the columns: Date, Time, Open, High, Low, Close.
-    Combines 'Date' and 'Time' into a datetime index.
+    Read the partitioned Parquet dataset written by historical_data_fetch.py
+    (year=YYYY/month=M/*.parquet), keeping only rows with start <= Date_Time <= end
+    (through the end of the day if end is a date only).
+    The year/month filter skips whole partitions; the Date_Time filter is pushed
+    down to the Parquet row groups.
+    """
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning='hive')
+    row_filter = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        row_filter = ((ds.field('year') > start.year)
+                      | ((ds.field('year') == start.year) & (ds.field('month') >= start.month)))
+        row_filter &= ds.field('Date_Time') >= start.to_datetime64()
+    if end is not None:
+        end = pd.Timestamp(end)
+        end_filter = ((ds.field('year') < end.year)
+                      | ((ds.field('year') == end.year) & (ds.field('month') <= end.month)))
+        if end == end.normalize():
+            # A date without a time includes the whole end day.
+            end_filter &= ds.field('Date_Time') < (end + pd.Timedelta(days=1)).to_datetime64()
+        else:
+            end_filter &= ds.field('Date_Time') <= end.to_datetime64()
+        row_filter = end_filter if row_filter is None else row_filter & end_filter
+
+    columns = ['Date_Time'] + [c for c in COLUMN_MAP if c in dataset.schema.names]
+    df = dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+    df = df.set_index('Date_Time').sort_index()
+    # Adjacent fetch windows share their boundary day, so drop repeated bars.
+    return df[~df.index.duplicated()]
+
+
+def load_data(data_file, short_window=10, long_window=50, start=None, end=None):
+    """
+    Load historical data from a CSV file, a Parquet file or a partitioned Parquet
+    dataset (directory) and prepare it for Backtrader.
+    Expects the data to have the columns: Date, Time, Open, High, Low, Close.
+    For CSV files, combines 'Date' and 'Time' into a datetime index (parsed with
+    PyArrow's CSV reader and compute kernels); Parquet files written by main.py
+    already carry the parsed 'Date_Time' index.
+    For a dataset directory, only the data between start and end (inclusive,
+    anything pd.Timestamp accepts; an end date without a time includes that
+    whole day) is read.
     Adds a dummy 'volume' column if not present.
+    Adds the short/long SMAs ('sma_s', 'sma_l') and their 'crossover' signal.
     """
-    df = pd.read_csv(csv_file)
-    # Combine 'Date' and 'Time' columns into a single datetime column.
-    df['Date_Time'] = pd.to_datetime(df['Date'] + " " + df['Time'], errors='coerce')
-    df.set_index('Date_Time', inplace=True)
+    if os.path.isdir(data_file):
+        df = _read_dataset(data_file, start=start, end=end)
+    elif data_file.endswith('.parquet'):
+        # Read only the price/volume columns (the Date_Time index is restored from the file metadata).
+        names = pq.read_schema(data_file).names
+        df = pd.read_parquet(data_file, engine='pyarrow', columns=[c for c in COLUMN_MAP if c in names])
+    else:
+        # Read only the needed columns, with 'Date' and 'Time' as strings so they
+        # can be joined before parsing. A missing 'Volume' is read as all nulls.
+        tbl = pv_csv.read_csv(
+            data_file,
+            read_options=pv_csv.ReadOptions(use_threads=True),
+            convert_options=pv_csv.ConvertOptions(
+                include_columns=['Date', 'Time', *COLUMN_MAP],
+                include_missing_columns=True,
+                column_types={'Date': pa.string(), 'Time': pa.string(), 'Volume': pa.int64()}))
+        if tbl['Volume'].null_count == tbl.num_rows:
+            tbl = tbl.drop_columns(['Volume'])
+        # Combine 'Date' and 'Time' columns into a single datetime; times may be
+        # HH:MM:SS or HH:MM. Any value that matches neither raises.
+        joined = pc.binary_join_element_wise(tbl['Date'], tbl['Time'], ' ')
+        date_time = pc.strptime(joined, format='%Y-%m-%d %H:%M:%S', unit='s', error_is_null=True)
+        if date_time.null_count:
+            date_time = pc.coalesce(date_time, pc.strptime(joined, format='%Y-%m-%d %H:%M',
+                                                           unit='s', error_is_null=True))
+        if date_time.null_count:
+            bad = pc.filter(joined, pc.is_null(date_time))[0].as_py()
+            raise ValueError(f"{date_time.null_count} rows of {data_file} have an unparseable "
+                             f"Date/Time (first: {bad!r})")
+        # Convert to pandas only at the boundary.
+        df = tbl.to_pandas()
+        df.index = pd.DatetimeIndex(date_time.cast(pa.timestamp('ns')).to_pandas(), name='Date_Time')
     
-    # Rename columns to lowercase as expected by Backtrader.
-    df = df.rename(columns={
-        "Open": "open",
-        "High": "high",
-        "Low": "low",
-        "Close": "close"
-    })
+    # Keep only the columns required by Backtrader, adding a dummy 'volume' if
+    # missing, then rename them to lowercase (in place, no extra copy).
+    df = df.reindex(columns=list(COLUMN_MAP), fill_value=0)
+    df.columns = list(COLUMN_MAP.values())
     
-    # If 'Volume' is missing, add a dummy column.
-    if 'Volume' not in df.columns:
-        df['volume'] = 0
-    else:
-        df = df.rename(columns={"Volume": "volume"})
+    # Precompute the moving averages and crossover signal once for the whole series.
+    close = df['close'].to_numpy(dtype=np.float64)
+    df['sma_s'] = _sma(close, short_window)
+    df['sma_l'] = _sma(close, long_window)
+    df['crossover'] = _crossover(df['sma_s'].to_numpy(), df['sma_l'].to_numpy())
+    return df
+
+
+class WindowView:
+    """
+    Zero-copy access to the last `window` closing prices up to a timestamp.
+    Uses a binary search (np.searchsorted) on the sorted datetime index instead of
+    a boolean filter over the whole DataFrame, so each lookup is O(log n) and
+    returns a view into the close array (do not modify it).
     
-    # Return only the columns required by Backtrader.
-    return df[["open", "high", "low", "close", "volume"]]
+    Example:
+      view = WindowView(load_data(data_file))
+      last_10 = view.at("2025-01-10 11:30", 10)
+    """
+    def __init__(self, df):
+        self.ts = df.index.values.astype('datetime64[ns]')
+        self.close = df['close'].values
+
+    def at(self, t, window):
+        """
+        Return up to `window` closing prices with a timestamp <= t (fewer at the start of the data).
+        """
+        end = np.searchsorted(self.ts, np.datetime64(t, 'ns'), side='right')
+        return self.close[max(0, end - window):end]
 
 # -------------------------------
-# 3. Backtest Setup and Execution
+# 3. Vectorized Backtest (no Backtrader event loop)
 # -------------------------------
 
-if __name__ == '__main__':
-    # Initialize the Cerebro engine.
-    cerebro = bt.Cerebro()
-    
-    # Path to your historical CSV file (update this path as needed).
-    csv_file = "h_data/NIFTY_ONE_MINUTE_2025-01-01_2025-01-31.csv"
-    data = load_data(csv_file)
-    
-    # Create a Backtrader data feed from the pandas DataFrame.
-    data_feed = bt.feeds.PandasData(dataname=data)
-    cerebro.adddata(data_feed)
-    
-    # Add the SMA Target-Stop strategy to Cerebro.
-    cerebro.addstrategy(SmaTargetStopStrategy, target=0.003, stop_loss=0.001,
-                        short_window=10, long_window=50)
+@njit(cache=True)
+def _simulate(close, signal, target, stop_loss):
+    """
+    Single pass over the closing prices, applying the same rules as
+    SmaTargetStopStrategy:
+    - When flat, enter long on signal +1 and short on signal -1.
+    - When in a position, exit on the target or stop-loss level derived
+      from the entry price.
+    Both rules are written without direction-dependent branches: the signal is
+    the new position when flat, and the exit test works on the signed move
+    (price - entry) * pos, which is the same comparison for longs and shorts.
+    Returns (long_trades, short_trades, winning_trades, losing_trades, pnl)
+    for closed trades, with a position size of one unit.
+    """
+    pos = 0
+    entry = 0.0
+    long_trades = 0
+    short_trades = 0
+    winning_trades = 0
+    losing_trades = 0
+    pnl = 0.0
+
+    for i in range(close.shape[0]):
+        price = close[i]
+
+        # Flat: enter in the direction of the crossover (stays flat on signal 0).
+        if pos == 0:
+            pos = signal[i]
+            entry = price
+            continue
+
+        # In a position: check target and stop-loss levels on the signed move.
+        trade_pnl = (price - entry) * pos
+        if (trade_pnl >= entry * target) | (trade_pnl <= -entry * stop_loss):
+            pnl += trade_pnl
+            long_trades += pos > 0
+            short_trades += pos < 0
+            winning_trades += trade_pnl >= 0
+            losing_trades += trade_pnl < 0
+            pos = 0
+
+    return long_trades, short_trades, winning_trades, losing_trades, pnl
+
+
+@njit(cache=True)
+def _incremental_crossover(close, short_window, long_window):
+    """
+    Compiled equivalent of _crossover(_sma(close, short_window), _sma(close, long_window)).
+    Both SMAs are kept as running sums (one add and one subtract per bar, whatever
+    the window length), so no SMA arrays are allocated.
+    """
+    n = close.shape[0]
+    signal = np.zeros(n, dtype=np.int8)
+    warmup = max(short_window, long_window) - 1  # First bar where both SMAs exist
+    short_sum = 0.0
+    long_sum = 0.0
+    prev_cross = 0.0
+
+    for i in range(n):
+        short_sum += close[i]
+        long_sum += close[i]
+        if i >= short_window:
+            short_sum -= close[i - short_window]
+        if i >= long_window:
+            long_sum -= close[i - long_window]
+
+        if i >= warmup:
+            cross = np.sign(short_sum / short_window - long_sum / long_window)
+            if cross != 0:  # Equal SMAs keep the last non-zero difference
+                if prev_cross != 0 and cross != prev_cross:
+                    signal[i] = cross
+                prev_cross = cross
+
+    return signal
+
+
+@njit(cache=True)
+def _one_backtest(close, short_window, long_window, target, stop_loss):
+    """
+    One fully compiled backtest: crossover signal plus simulation.
+    Returns the _simulate() statistics as a float array.
+    """
+    signal = _incremental_crossover(close, short_window, long_window)
+    long_trades, short_trades, winning_trades, losing_trades, pnl = _simulate(
+        close, signal, target, stop_loss)
+    out = np.empty(5)
+    out[0] = long_trades
+    out[1] = short_trades
+    out[2] = winning_trades
+    out[3] = losing_trades
+    out[4] = pnl
+    return out
+
+
+@njit(parallel=True, cache=True)
+def sweep(close, short_windows, long_windows, targets, stop_losses):
+    """
+    Run one backtest per configuration k = (short_windows[k], long_windows[k],
+    targets[k], stop_losses[k]), with configurations spread over all CPU threads.
+    Returns a (k, 5) array of (long_trades, short_trades, winning_trades,
+    losing_trades, pnl).
+    """
+    out = np.empty((short_windows.shape[0], 5))
+    for k in prange(short_windows.shape[0]):
+        out[k] = _one_backtest(close, short_windows[k], long_windows[k], targets[k], stop_losses[k])
+    return out
+
+
+# Keys of _trade_stats(), i.e. the statistics columns of run_parameter_sweep()
+_STATS_COLUMNS = ['total_trades', 'long_trades', 'short_trades', 'winning_trades',
+                  'losing_trades', 'win_probability', 'pnl']
+
+
+def _trade_stats(long_trades, short_trades, winning_trades, losing_trades, pnl):
+    """
+    Trade statistics dictionary, with the same metrics as the summary table.
+    """
+    total_trades = long_trades + short_trades
+    return {
+        'total_trades': total_trades,
+        'long_trades': long_trades,
+        'short_trades': short_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'win_probability': (winning_trades / total_trades * 100) if total_trades > 0 else 0,
+        'pnl': pnl,
+    }
+
+
+def run_backtest_fast(df, target=0.003, stop_loss=0.001, short_window=10, long_window=50):
+    """
+    Run the SMA target/stop-loss strategy as a vectorized pass over the data.
+    Both SMAs and the crossover signal are precomputed with NumPy, then a single
+    compiled loop tracks position, entry and exit. Trades are filled at the
+    close of the signal bar, so results can differ slightly from Backtrader,
+    which fills market orders at the next bar's open.
+    Returns a dictionary with the same trade statistics as the summary table.
+    """
+    close = df['close'].to_numpy(dtype=np.float64)
+    return _backtest_close(close, target, stop_loss, short_window, long_window)
+
+
+def _backtest_close(close, target, stop_loss, short_window, long_window):
+    """
+    run_backtest_fast() on a closing-price array (used directly by parameter sweeps).
+    """
+    signal = _crossover(_sma(close, short_window), _sma(close, long_window))
+
+    return _trade_stats(*_simulate(close, signal, target, stop_loss))
+
+
+def run_parameter_sweep(df, short_windows, long_windows, targets, stop_losses, n_jobs=-1, backend='numba'):
+    """
+    Run run_backtest_fast() for every (short_window, long_window, target, stop_loss)
+    combination, in parallel.
+    Combinations where short_window >= long_window are skipped.
     
-    # Set the initial portfolio value.
-    cerebro.broker.setcash(100000.0)
+    Backends:
+      'numba': the compiled sweep() kernel, configurations spread over threads
+               in this process (n_jobs is ignored; see numba.set_num_threads).
+      'joblib': worker processes; the closing prices are written once to a
+               memory-mapped file, so all workers share the same read-only data
+               instead of receiving a pickled copy per task.
+    Returns a DataFrame with one row per combination: the parameters followed by
+    the trade statistics (no rows, but the same columns, if no combination is valid).
     
-    print("Starting Portfolio Value: %.2f" % cerebro.broker.getvalue())
+    Example:
+      results = run_parameter_sweep(data, [5, 10, 20], [50, 100], [0.002, 0.003], [0.001])
+      print(results.sort_values('pnl', ascending=False).head())
+    """
+    params = [p for p in itertools.product(short_windows, long_windows, targets, stop_losses) if p[0] < p[1]]
+    close = df['close'].to_numpy(dtype=np.float64)
+    results = pd.DataFrame(params, columns=['short_window', 'long_window', 'target', 'stop_loss'])
+
+    if backend == 'numba':
+        out = sweep(close,
+                    results['short_window'].to_numpy(dtype=np.int64),
+                    results['long_window'].to_numpy(dtype=np.int64),
+                    results['target'].to_numpy(dtype=np.float64),
+                    results['stop_loss'].to_numpy(dtype=np.float64))
+        stats = [_trade_stats(*row[:4].astype(np.int64).tolist(), row[4]) for row in out]
+        return pd.concat([results, pd.DataFrame(stats, columns=_STATS_COLUMNS)], axis=1)
+    if backend != 'joblib':
+        raise ValueError(f"Unknown sweep backend: {backend}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mmap_file = os.path.join(tmp_dir, 'close.mmap')
+        close_mmap = np.memmap(mmap_file, dtype=np.float64, mode='w+', shape=close.shape)
+        close_mmap[:] = close
+        close_mmap.flush()
+        close_mmap = np.memmap(mmap_file, dtype=np.float64, mode='r', shape=close.shape)
+
+        stats = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(_backtest_close)(close_mmap, target, stop_loss, short_window, long_window)
+            for short_window, long_window, target, stop_loss in params)
+        del close_mmap  # Release the file before the temporary directory is removed
+
+    return pd.concat([results, pd.DataFrame(stats, columns=_STATS_COLUMNS)], axis=1)
+
+# -------------------------------
+# 4. Backtest Setup and Execution
+# -------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backtest the SMA target/stop-loss strategy.")
+    parser.add_argument('--engine', choices=['fast', 'backtrader'], default='fast',
+                        help="'fast': compiled vectorized backtest (default); "
+                             "'backtrader': full Backtrader run with order logs and portfolio values")
+    parser.add_argument('--plot', action='store_true',
+                        help="plot the Backtrader results (requires --engine backtrader)")
+    args = parser.parse_args()
+    if args.plot and args.engine != 'backtrader':
+        parser.error("--plot requires --engine backtrader")
     
-    # -------------------------------
-    # Add Trade Analyzer for Summary
-    # -------------------------------
-    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trade_analyzer')
+    # Strategy parameters.
+    target, stop_loss = 0.003, 0.001
+    short_window, long_window = 10, 50
     
-    # Run the backtest.
-    results = cerebro.run()
-    final_value = cerebro.broker.getvalue()
-    print("Final Portfolio Value: %.2f" % final_value)
+    # Path to your historical CSV or Parquet file (update this path as needed).
+    data_file = "h_data/NIFTY_ONE_MINUTE_2025-01-01_2025-01-31.csv"
+    data = load_data(data_file, short_window=short_window, long_window=long_window)
     
-    # Extract trade analysis.
-    trade_analyzer = results[0].analyzers.trade_analyzer.get_analysis()
-    total_trades = trade_analyzer.get('total', {}).get('closed', 0)
-    long_trades = trade_analyzer.get('long', {}).get('total', 0)
-    short_trades = trade_analyzer.get('short', {}).get('total', 0)
-    winning_trades = trade_analyzer.get('won', {}).get('total', 0)
-    losing_trades = trade_analyzer.get('lost', {}).get('total', 0)
-    win_probability = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+    if args.engine == 'fast':
+        # Run the backtest without Backtrader's per-bar event loop.
+        stats = run_backtest_fast(data, target=target, stop_loss=stop_loss,
+                                  short_window=short_window, long_window=long_window)
+        print("Net P&L (points, 1 unit per trade): %.2f" % stats['pnl'])
+    else:
+        # Initialize the Cerebro engine.
+        cerebro = bt.Cerebro()
+        
+        # Create a Backtrader data feed from the pandas DataFrame.
+        data_feed = SmaPandasData(dataname=data)
+        cerebro.adddata(data_feed)
+        
+        # Add the SMA Target-Stop strategy to Cerebro.
+        cerebro.addstrategy(SmaTargetStopStrategy, target=target, stop_loss=stop_loss,
+                            short_window=short_window, long_window=long_window)
+        
+        # Set the initial portfolio value.
+        cerebro.broker.setcash(100000.0)
+        
+        print("Starting Portfolio Value: %.2f" % cerebro.broker.getvalue())
+        
+        # -------------------------------
+        # Add Trade Analyzer for Summary
+        # -------------------------------
+        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trade_analyzer')
+        
+        # Run the backtest.
+        results = cerebro.run()
+        final_value = cerebro.broker.getvalue()
+        print("Final Portfolio Value: %.2f" % final_value)
+        
+        # Extract trade analysis.
+        trade_analyzer = results[0].analyzers.trade_analyzer.get_analysis()
+        total_trades = trade_analyzer.get('total', {}).get('closed', 0)
+        winning_trades = trade_analyzer.get('won', {}).get('total', 0)
+        stats = {
+            'total_trades': total_trades,
+            'long_trades': trade_analyzer.get('long', {}).get('total', 0),
+            'short_trades': trade_analyzer.get('short', {}).get('total', 0),
+            'winning_trades': winning_trades,
+            'losing_trades': trade_analyzer.get('lost', {}).get('total', 0),
+            'win_probability': (winning_trades / total_trades * 100) if total_trades > 0 else 0,
+        }
     
     # Create a summary table.
     summary_table = f"""
     +----------------------------------------+-----------------+
     | Metric                                 | Value           |
     +----------------------------------------+-----------------+
-    | Total Closed Trades                    | {total_trades}              |
-    | Long Trades                            | {long_trades}              |
-    | Short Trades                           | {short_trades}              |
-    | Winning Trades                         | {winning_trades}              |
-    | Losing Trades                          | {losing_trades}              |
-    | Winning Probability (%)                | {win_probability:.2f}%       |
+    | Total Closed Trades                    | {stats['total_trades']}              |
+    | Long Trades                            | {stats['long_trades']}              |
+    | Short Trades                           | {stats['short_trades']}              |
+    | Winning Trades                         | {stats['winning_trades']}              |
+    | Losing Trades                          | {stats['losing_trades']}              |
+    | Winning Probability (%)                | {stats['win_probability']:.2f}%       |
     +----------------------------------------+-----------------+
     """
     print(summary_table)
     
     # -------------------------------
-    # Plot the Backtest Results (Non-blocking)
+    # Plot the Backtest Results (Non-blocking, only when requested)
     # -------------------------------
-    cerebro.plot(show=False)
+    if args.plot:
+        # Skip the volume panel: the strategy does not use volume.
+        cerebro.plot(show=False, iplot=False, volume=False)
@@ -0,0 +1,14 @@
+# candles.py
+import pandas as pd
+
+# One SmartAPI candle row: [DateTime, Open, High, Low, Close, Volume]
+CANDLE_COLUMNS = ['DateTime', 'Open', 'High', 'Low', 'Close', 'Volume']
+CANDLE_DTYPES = {'Open': 'float64', 'High': 'float64', 'Low': 'float64', 'Close': 'float64', 'Volume': 'int64'}
+
+
+def candles_to_frame(rows):
+    """
+    Build a DataFrame from the candle rows of a getCandleData response,
+    with float64 prices and int64 volume ('DateTime' stays an ISO-8601 string).
+    """
+    return pd.DataFrame(rows, columns=CANDLE_COLUMNS).astype(CANDLE_DTYPES)
@@ -1,5 +1,7 @@
 # config.py
 import os
+from functools import lru_cache
+import pyotp
 from dotenv import load_dotenv
 
 # Construct the path to the config.env file in the parent directory
@@ -14,3 +16,10 @@ TOTP_SECRET = os.getenv("TOTP_SECRET")
 
 if not API_KEY or not USERNAME or not MPIN or not TOTP_SECRET:
     raise ValueError("One or more required environment variables are missing. Check your config.env file.")
+
+@lru_cache(maxsize=1)
+def totp() -> pyotp.TOTP:
+    """
+    TOTP generator for TOTP_SECRET, built once and reused (call totp().now() for the current code).
+    """
+    return pyotp.TOTP(TOTP_SECRET)
@@ -1,32 +1,23 @@
-import time
+import asyncio
+import aiohttp
+from collections import deque
+import glob
+import hashlib
+import json
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
-from SmartApi import SmartConnect
-import pyotp
+from urllib.parse import urljoin
+from aiolimiter import AsyncLimiter
+from tenacity import retry, stop_after_attempt, wait_exponential
 from logzero import logger
-from config import API_KEY, USERNAME, MPIN, TOTP_SECRET
+from auth import get_session
+from candles import candles_to_frame
 from datetime import datetime, timedelta
 
-# Initialize API Connection
-smartApi = SmartConnect(API_KEY)
-
-# Generate TOTP
-try:
-    totp = pyotp.TOTP(TOTP_SECRET).now()
-except Exception as e:
-    logger.error("Invalid Token: The provided token is not valid.")
-    raise e
-
-# Authenticate
-data = smartApi.generateSession(USERNAME, MPIN, totp)
-if not data.get('status'):
-    logger.error(data)
-    raise ValueError("Login failed. Check credentials or try again later.")
-
-authToken = data['data']['jwtToken']
-refreshToken = data['data']['refreshToken']
-feedToken = smartApi.getfeedToken()
-smartApi.generateToken(refreshToken)
+# Initialize and authenticate API Connection (cached session reused if still valid)
+smartApi = get_session()
 
 # Set parameters
 symbol = "NIFTY"
@@ -37,17 +28,72 @@ start_year = 2005
 end_year = 2025
 output_dir = "h_data"
 os.makedirs(output_dir, exist_ok=True)  # Ensure directory exists
+cache_dir = os.path.join(output_dir, "cache")  # Successful responses, reused on re-runs
+os.makedirs(cache_dir, exist_ok=True)
+
+# SmartAPI rate limit: max 3 requests per second. Requests are paced by a token
+# bucket just below that (one token every 0.4 s = 2.5 req/s, no bursts), so no
+# 1-second window ever sees more than 3 requests.
+request_interval = 0.4  # Seconds between requests
+concurrency = 3  # Max requests in flight at once
+
+# The candle endpoint is called directly with aiohttp, using the same headers
+# (and the JWT of the session above) as SmartConnect's own requests.
+candle_url = urljoin(smartApi.root, smartApi._routes["api.candle.data"])
+headers = smartApi.requestHeaders()
+headers["Authorization"] = f"Bearer {smartApi.access_token}"
 
 # Generate all date ranges (30-day intervals)
 current_date = datetime(start_year, 1, 1)
 end_date = datetime(end_year, 1, 1)
 
-all_data = []
-missing_dates = []
-first_date, last_date = None, None  # To store first and last dates for naming
+date_ranges = []
+while current_date < end_date:
+    next_date = current_date + timedelta(days=30)
+    date_ranges.append((current_date.strftime("%Y-%m-%d"), next_date.strftime("%Y-%m-%d")))
+    current_date = next_date  # Move to next date range
 
-# Function to fetch data with rate limiting and retries
-def fetch_historical_data(from_date, to_date):
+# Raised when SmartAPI rejects a request for exceeding the rate limit
+class RateLimitError(Exception):
+    pass
+
+# Single candle request; retried up to 3 times with exponential backoff.
+# The request slot and rate-limit token are only held for the HTTP call itself,
+# so windows waiting to retry don't block other windows.
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), reraise=True)
+async def request_candle_data(session, semaphore, limiter, historicParam):
+    async with semaphore, limiter:  # **Rate limiting: 2.5 requests per second (API max is 3)**
+        async with session.post(candle_url, json=historicParam, headers=headers) as resp:
+            status = resp.status
+            body = await resp.text()
+
+    # A rate-limited request comes back as 429 or as a plain-text (non-JSON) 403
+    if status == 429 or (status == 403 and not body.lstrip().startswith("{")):
+        logger.warning(f"Rate limited for {historicParam['fromdate']} to {historicParam['todate']}, retrying...")
+        raise RateLimitError(body.strip() or f"HTTP {status}")
+    if status != 200:
+        raise ValueError(f"HTTP {status}: {body.strip()}")
+    response = json.loads(body) if body else None
+
+    if response and "data" in response and response["data"]:
+        return response["data"]
+    logger.warning(f"No data received for {historicParam['fromdate']} to {historicParam['todate']}, retrying...")
+    raise ValueError(response.get("message") if response else "Empty response")
+
+# Cache file for one (symbol, interval, from_date, to_date) window
+def cache_path(from_date, to_date):
+    key = hashlib.sha256(f"{symbol}|{interval}|{from_date}|{to_date}".encode()).hexdigest()
+    return os.path.join(cache_dir, f"{key}.json")
+
+# Load a cached window (read by the writer loop, one window at a time)
+def read_cache(from_date, to_date):
+    print(f"Using cached data from {from_date} to {to_date}")
+    with open(cache_path(from_date, to_date)) as f:
+        return json.load(f)
+
+# Function to fetch data with rate limiting and retries (complete windows are saved to the disk cache)
+async def fetch_historical_data(session, semaphore, limiter, from_date, to_date):
+    cache_file = cache_path(from_date, to_date)
     historicParam = {
         "exchange": exchange,
         "symboltoken": symbol_token,
@@ -56,50 +102,103 @@ def fetch_historical_data(from_date, to_date):
         "todate": f"{to_date} 15:30"
     }
 
-    for attempt in range(3):  # Retry up to 3 times if request fails
-        try:
-            response = smartApi.getCandleData(historicParam)
-            if response and "data" in response and response["data"]:
-                return response["data"]
-            else:
-                logger.warning(f"No data received for {from_date} to {to_date}, retrying...")
-        except Exception as e:
-            logger.error(f"Error fetching data for {from_date} to {to_date}: {e}")
-        time.sleep(5)  # Wait before retrying
-
-    logger.error(f"Failed to fetch data for {from_date} to {to_date} after 3 attempts.")
-    return None  # Return None if all retries fail
-
-while current_date < end_date:
-    next_date = current_date + timedelta(days=30)
-    from_date = current_date.strftime("%Y-%m-%d")
-    to_date = next_date.strftime("%Y-%m-%d")
-
-    print(f"Fetching data from {from_date} to {to_date}...")
-    data = fetch_historical_data(from_date, to_date)
-
-    if data:
-        if first_date is None:
-            first_date = from_date  # Capture first date for filename
-        last_date = to_date  # Capture last date for filename
-
-        df = pd.DataFrame(data, columns=["DateTime", "Open", "High", "Low", "Close", "Volume"])
-        df[['Date', 'Time']] = df['DateTime'].str.split('T', expand=True)
-        df[['Time', 'Timezone']] = df['Time'].str.extract(r'([^+]+)(\+\d{2}:\d{2})?')
-        df = df[['Date', 'Time', 'Timezone', 'Open', 'High', 'Low', 'Close']]
-        all_data.append(df)
-    else:
-        missing_dates.append((from_date, to_date))  # Log missing data
-
-    time.sleep(0.4)  # **Rate limiting: Max 3 requests per second**
-    current_date = next_date  # Move to next date range
-
-# Save all data to HDF file
-if all_data and first_date and last_date:
-    hdf_file = os.path.join(output_dir, f"{symbol}_{interval}_{first_date}_{last_date}.h5")
-    final_df = pd.concat(all_data, ignore_index=True)
-    final_df.to_hdf(hdf_file, key="data", mode="w")
-    print(f"Data successfully saved to {hdf_file}")
+    try:
+        data = await request_candle_data(session, semaphore, limiter, historicParam)
+    except Exception as e:
+        logger.error(f"Failed to fetch data for {from_date} to {to_date} after 3 attempts: {e}")
+        return None  # Return None (not cached) if all retries fail, so the next run retries
+    print(f"Fetched data from {from_date} to {to_date}")
+
+    # Only cache complete windows: a window reaching today (or later) is still
+    # filling up, so it is fetched again on the next run.
+    if datetime.strptime(to_date, "%Y-%m-%d").date() < datetime.now().date():
+        with open(cache_file, "w") as f:
+            json.dump(data, f)
+    return data
+
+# Fetch all date ranges concurrently (bounded by the API rate limit) and write
+# each window, in date order, to a Parquet dataset partitioned by year/month
+async def fetch_and_save(date_ranges, dataset_dir, concurrency=3):
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = AsyncLimiter(1, request_interval)
+    missing_dates = []
+    first_date, last_date = None, None  # To report the saved date range
+    prefetch = 2 * concurrency  # Max network fetches running ahead of the writer
+
+    # Windows already in the dataset ("{from_date}_{to_date}" of their file names)
+    saved_windows = {os.path.basename(path).rsplit("-", 1)[0]
+                     for path in glob.glob(os.path.join(dataset_dir, "year=*", "month=*", "*.parquet"))}
+
+    async with aiohttp.ClientSession() as session:
+        upcoming = iter(date_ranges)
+        pending = deque()  # (from_date, to_date, fetch task or None if the window is cached)
+        in_flight = 0
+
+        # Queue windows in date order until `prefetch` fetches are running; cached
+        # windows only get a placeholder and are read when the writer reaches them.
+        def schedule():
+            nonlocal in_flight
+            while in_flight < prefetch:
+                window = next(upcoming, None)
+                if window is None:
+                    return
+                if os.path.exists(cache_path(*window)):
+                    pending.append((*window, None))
+                else:
+                    task = asyncio.create_task(fetch_historical_data(session, semaphore, limiter, *window))
+                    pending.append((*window, task))
+                    in_flight += 1
+
+        schedule()
+        while pending:
+            from_date, to_date, task = pending.popleft()
+            # Cached windows whose files were written on an earlier run are not rewritten
+            already_saved = task is None and f"{from_date}_{to_date}" in saved_windows
+            if task is not None:
+                data = await task
+                in_flight -= 1
+            elif not already_saved:
+                data = read_cache(from_date, to_date)
+            schedule()
+
+            if not already_saved and not data:
+                missing_dates.append((from_date, to_date))  # Log missing data
+                continue
+
+            if first_date is None:
+                first_date = from_date  # Capture first date of the saved range
+            last_date = to_date  # Capture last date of the saved range
+            if already_saved:
+                continue
+
+            df = candles_to_frame(data)
+            ts = pd.to_datetime(df['DateTime'], utc=True, format='ISO8601').dt.tz_convert('Asia/Kolkata')
+            utc_offset = ts.iloc[0].strftime('%z')
+            df['Date_Time'] = ts.dt.tz_localize(None)  # Local (IST) time, used for ranged reads
+            df['Date'] = ts.dt.date
+            df['Time'] = ts.dt.time
+            df['Timezone'] = f"{utc_offset[:3]}:{utc_offset[3:]}"
+            df['year'] = ts.dt.year
+            df['month'] = ts.dt.month
+            df = df[['Date_Time', 'Date', 'Time', 'Timezone', 'Open', 'High', 'Low', 'Close', 'year', 'month']]
+
+            # One file per window and partition; re-running a window overwrites its files
+            pq.write_to_dataset(pa.Table.from_pandas(df, preserve_index=False),
+                                root_path=dataset_dir,
+                                partition_cols=['year', 'month'],
+                                basename_template=f"{from_date}_{to_date}-{{i}}.parquet",
+                                existing_data_behavior='overwrite_or_ignore',
+                                compression='zstd')
+
+    return first_date, last_date, missing_dates
+
+# Partitioned dataset: h_data/NIFTY_ONE_MINUTE/year=YYYY/month=M/*.parquet
+dataset_dir = os.path.join(output_dir, f"{symbol}_{interval}")
+first_date, last_date, missing_dates = asyncio.run(
+    fetch_and_save(date_ranges, dataset_dir, concurrency=concurrency))
+
+if first_date and last_date:
+    print(f"Data from {first_date} to {last_date} successfully saved to {dataset_dir}")
 
 # Save missing data log **inside h_data directory**
 if missing_dates:
@@ -1,40 +1,15 @@
 # main.py
 
 # Import necessary libraries
-from SmartApi import SmartConnect  # or: from SmartApi.smartConnect import SmartConnect
-import pyotp
 from logzero import logger
+import numpy as np
 import pandas as pd
-from config import API_KEY, USERNAME, MPIN, TOTP_SECRET  # Import credentials from config.py
+from auth import get_session  # Authenticated Smart API session (cached between runs)
+from candles import candles_to_frame
 import os
 
-# Initialize Smart API connection
-smartApi = SmartConnect(API_KEY)
-
-# Generate TOTP using the TOTP secret from .env
-try:
-    totp = pyotp.TOTP(TOTP_SECRET).now()
-except Exception as e:
-    logger.error("Invalid Token: The provided token is not valid.")
-    raise e
-
-# Authenticate using MPIN (as password login is no longer allowed)
-data = smartApi.generateSession(USERNAME, MPIN, totp)
-
-# Check for login errors
-if data['status'] == False:
-    logger.error(data)
-    raise ValueError("Login failed. Check credentials or try again later.")
-else:
-    authToken = data['data']['jwtToken']
-    refreshToken = data['data']['refreshToken']
-    
-    # Fetch the feed token for market data
-    feedToken = smartApi.getfeedToken()
-    
-    # Fetch user profile
-    res = smartApi.getProfile(refreshToken)
-    smartApi.generateToken(refreshToken)
+# Initialize Smart API connection (logs in with MPIN + TOTP only if no cached session is valid)
+smartApi = get_session()
 
 # Define parameters for historical data request
 symbol = "NIFTY"  # Example: Change this as needed
@@ -66,32 +41,40 @@ if not response or 'data' not in response or not response['data']:
 # Extract only the 'data' field from the response
 candle_data = response['data']
 
-# Convert the extracted data into a structured pandas DataFrame
-df = pd.DataFrame(candle_data, columns=["DateTime", "Open", "High", "Low", "Close", "Volume"])
+# Convert the extracted data into a pandas DataFrame with typed OHLC/Volume columns
+df = candles_to_frame(candle_data)
 
-# Split "DateTime" into "Date", "Time", and "Timezone"
-df[['Date', 'Time']] = df['DateTime'].str.split('T', expand=True)
+# Parse the ISO-8601 "DateTime" in one vectorized pass, in exchange (IST) time
+ts = pd.to_datetime(df['DateTime'], utc=True, format='ISO8601').dt.tz_convert('Asia/Kolkata')
 
-# Extract timezone from the time column (if applicable)
-df[['Time', 'Timezone']] = df['Time'].str.extract(r'([^+]+)(\+\d{2}:\d{2})?')
+# Split it into "Date", "Time", and "Timezone" (formatted once, e.g. "+05:30")
+utc_offset = ts.iloc[0].strftime('%z')
+df['Date'] = ts.dt.date
+df['Time'] = ts.dt.time
+df['Timezone'] = f"{utc_offset[:3]}:{utc_offset[3:]}"
 
 # Reorder the DataFrame with structured columns
 df = df[['Date', 'Time', 'Timezone', 'Open', 'High', 'Low', 'Close']]
 
+# Keep the parsed local datetime as the index, so backtests don't have to parse it
+df.index = ts.dt.tz_localize(None).rename('Date_Time')
+
 # Define the output directory and formatted file name
 output_dir = "h_data"
 os.makedirs(output_dir, exist_ok=True)  # Ensure directory exists
 
-# Format file name as "Symbol_Interval_FromDate_ToDate.csv"
-output_file = os.path.join(output_dir, f"{symbol}_{interval}_{from_date}_{to_date}.csv")
+# Format file name as "Symbol_Interval_FromDate_ToDate.parquet"
+output_file = os.path.join(output_dir, f"{symbol}_{interval}_{from_date}_{to_date}.parquet")
 
 # Calculate the return as the percentage change from Open to Close.
-# First, compute the return value as a float with two decimals.
-return_values = ((df['Close'] - df['Open']) / df['Open'] * 100).round(2)
+# First, compute the return value as a float with two decimals (on raw arrays, no index alignment).
+open_prices = df['Open'].to_numpy(dtype=np.float64)
+close_prices = df['Close'].to_numpy(dtype=np.float64)
+return_values = pd.Series(np.round((close_prices - open_prices) * 100.0 / open_prices, 2), index=df.index)
 # Then, format these values as strings with a "%" sign appended.
-df['Return'] = return_values.apply(lambda x: f"{x:.2f} %")
+df['Return'] = return_values.map("{:.2f} %".format)
 
-# Save the formatted DataFrame to a CSV file without the index column
-df.to_csv(output_file, index=False)
+# Save the formatted DataFrame to a Parquet file (typed columns, keeps the datetime index)
+df.to_parquet(output_file, engine='pyarrow', compression='zstd')
 
 print(f"Data has been successfully saved to {output_file}")
\ No newline at end of file